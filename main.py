@@ -1,9 +1,412 @@
+import argparse
+import json
+import math
 import os
+import shutil
+import sys
 import tkinter as tk
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import filedialog, messagebox, ttk
 from PIL import Image, ImageTk, ImageDraw, ImageFilter, ImageChops
 import numpy as np
 
+PATCH_DIR_NAME = "merge_patches"  # Sidecar patch store, kept next to the data_dst frames
+
+
+class PatchStore:
+    """Sidecar store for traced-area patches, indexed by frame number.
+
+    Each frame with patches gets one compressed .npz file holding, per patch, the polygon
+    vertices, feather radius, bounding box and the bit-packed mask cropped to that box.
+    index.json maps frame numbers to files so frames are only read when asked for.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.index_path = os.path.join(directory, "index.json")
+        self.index = {}
+        if os.path.isfile(self.index_path):
+            with open(self.index_path) as f:
+                self.index = {int(number): name for number, name in json.load(f)["frames"].items()}
+
+    def frame_numbers(self):
+        return sorted(self.index)
+
+    def load(self, image_number):
+        name = self.index.get(image_number)
+        if name is None:
+            return []
+
+        patches = []
+        with np.load(os.path.join(self.directory, name)) as data:
+            for i in range(int(data["count"])):
+                bbox = tuple(int(v) for v in data[f"bbox_{i}"])
+                width, height = bbox[2] - bbox[0], bbox[3] - bbox[1]
+                mask = np.unpackbits(data[f"mask_{i}"], count=width * height).reshape(height, width)
+                patches.append({
+                    "polygon": [tuple(p) for p in data[f"polygon_{i}"].tolist()],
+                    "feather": int(data[f"feather_{i}"]),
+                    "bbox": bbox,
+                    "mask": mask.astype(bool),
+                })
+        return patches
+
+    def add(self, image_number, patches):
+        patches = self.load(image_number) + list(patches)
+        name = f"{str(image_number).zfill(5)}.npz"
+
+        arrays = {"count": np.array(len(patches))}
+        for i, patch in enumerate(patches):
+            arrays[f"polygon_{i}"] = np.array(patch["polygon"], dtype=np.int32)
+            arrays[f"feather_{i}"] = np.array(patch["feather"])
+            arrays[f"bbox_{i}"] = np.array(patch["bbox"], dtype=np.int32)
+            arrays[f"mask_{i}"] = np.packbits(patch["mask"])
+
+        os.makedirs(self.directory, exist_ok=True)
+        np.savez_compressed(os.path.join(self.directory, name), **arrays)
+        self.index[image_number] = name
+        self.write_index()
+
+    def remove(self, image_number):
+        # Returns the number of patches removed so callers can report it
+        name = self.index.pop(image_number, None)
+        if name is None:
+            return 0
+
+        path = os.path.join(self.directory, name)
+        with np.load(path) as data:
+            count = int(data["count"])
+        os.remove(path)
+        self.write_index()
+        return count
+
+    def write_index(self):
+        # Write to a temporary file first so an interrupted save never leaves a truncated index
+        temp_path = self.index_path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"version": 1, "frames": {str(n): self.index[n] for n in sorted(self.index)}}, f)
+        os.replace(temp_path, self.index_path)
+
+
+def make_patch(polygon, size, feather):
+    # Rasterise the polygon once and keep only the part of the mask inside its bounding box
+    mask = Image.new("L", size, 0)
+    ImageDraw.Draw(mask).polygon(polygon, fill=255)
+    bbox = mask.getbbox()
+    if bbox is None:
+        return None
+    return {
+        "polygon": [(int(x), int(y)) for x, y in polygon],
+        "feather": feather,
+        "bbox": bbox,
+        "mask": np.array(mask.crop(bbox)) > 0,
+    }
+
+
+def apply_patch(merged_image, original_image, patch):
+    # Only the bounding box (grown by the blur reach when feathering) is masked and pasted
+    x1, y1, x2, y2 = patch["bbox"]
+    pad = 3 * patch["feather"]
+    region = (max(0, x1 - pad), max(0, y1 - pad),
+              min(merged_image.width, x2 + pad), min(merged_image.height, y2 + pad))
+
+    mask = Image.new("L", (region[2] - region[0], region[3] - region[1]), 0)
+    mask.paste(Image.fromarray(patch["mask"].astype(np.uint8) * 255), (x1 - region[0], y1 - region[1]))
+    if patch["feather"] > 0:
+        mask = mask.filter(ImageFilter.GaussianBlur(radius=patch["feather"]))
+
+    merged_image.paste(original_image.crop(region), region[:2], mask=mask)
+
+
+def patch_store_for(merged_dir):
+    # Patches are stored next to data_dst so they survive re-merging into the merged directory.
+    # Normalising first stops a trailing slash from making dirname() return merged_dir itself.
+    original_dir = os.path.dirname(os.path.normpath(os.path.abspath(merged_dir)))
+    return PatchStore(os.path.join(original_dir, PATCH_DIR_NAME))
+
+
+def reapply_patches(merged_dir, max_workers=None):
+    """Replay every stored patch over a freshly merged directory, one frame per worker.
+
+    Returns the number of patched frames and a list of (frame number, exception) failures.
+    """
+    store = patch_store_for(merged_dir)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return collect_patch_replay(submit_patch_replay(executor, merged_dir, store))
+
+
+def submit_patch_replay(executor, merged_dir, store):
+    return [(image_number, executor.submit(replay_frame_patches, merged_dir, store, image_number))
+            for image_number in store.frame_numbers()]
+
+
+def collect_patch_replay(futures):
+    # Failures are collected per frame so one bad image does not stop the rest being reported
+    count = 0
+    errors = []
+    for image_number, future in futures:
+        error = future.exception()
+        if error:
+            print(f"Failed to reapply patches to frame {image_number}: {error}")
+            errors.append((image_number, error))
+        else:
+            count += future.result()
+    return count, errors
+
+
+def replay_frame_patches(merged_dir, store, image_number):
+    # Returns 1 if the frame was patched and 0 if it was skipped, so results can be summed
+    merged_dir = os.path.normpath(os.path.abspath(merged_dir))
+    filename = f"{str(image_number).zfill(5)}.png"
+    merged_image_path = os.path.join(merged_dir, filename)
+    original_image_path = os.path.join(os.path.dirname(merged_dir), filename)
+    if not (os.path.isfile(merged_image_path) and os.path.isfile(original_image_path)):
+        print(f"Skipping frame {image_number}: merged or original image not found.")
+        return 0
+
+    with Image.open(merged_image_path) as merged, Image.open(original_image_path) as original:
+        merged_image = merged.copy()
+        for patch in store.load(image_number):
+            apply_patch(merged_image, original, patch)
+    merged_image.save(merged_image_path)
+    return 1
+
+
+def backup_frame_file(path):
+    # Keep-oldest backup for repeated "Use This" picks, so a later pick never replaces the original render
+    backup_path = path + ".bak"
+    if os.path.isfile(path) and not os.path.exists(backup_path):
+        os.rename(path, backup_path)
+
+
+def copy_frame_file(source_path, target_path, backup):
+    # Byte-for-byte copy of an already encoded frame, so nothing is decoded or re-encoded
+    if backup and os.path.isfile(target_path):
+        os.rename(target_path, target_path + ".bak")  # Rename the old file to create a backup
+    shutil.copyfile(source_path, target_path)
+
+
+class DisplayFrameCache:
+    """LRU cache of frames decoded once and downscaled to display resolution.
+
+    Entries are keyed by path and display size, so panes of the same size share one buffer,
+    and remember the file's modification time so frames rewritten on disk are decoded again.
+    """
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+
+    def get(self, path, size):
+        if not os.path.isfile(path):
+            return None
+        key = (path, size)
+        mtime = os.stat(path).st_mtime_ns
+        if key in self.entries and self.entries[key][0] == mtime:
+            self.entries.move_to_end(key)
+            return self.entries[key][1]
+
+        with Image.open(path) as image:
+            image.draft("RGB", size)  # Lets JPEG decode straight at a reduced scale
+            image = image.convert("RGB")
+        image.thumbnail(size, Image.Resampling.LANCZOS)
+
+        self.entries[key] = (mtime, image)
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return image
+
+    def invalidate(self, path):
+        for key in [key for key in self.entries if key[0] == path]:
+            del self.entries[key]
+
+
+class CompareWindow(tk.Toplevel):
+    """Side-by-side view of several merged directories rendered from the same data_dst."""
+
+    def __init__(self, master, original_dir, merged_dirs):
+        super().__init__(master)
+
+        self.title("DeepFaceLab: Compare Merges")
+
+        self.original_dir = original_dir
+        self.merged_dirs = merged_dirs
+        self.cache = DisplayFrameCache()
+        self.current_image_number = tk.IntVar(value=1)
+        self.show_original_var = tk.BooleanVar(value=False)  # Show data_dst in every pane
+        self.range_start = tk.IntVar(value=1)  # First frame copied by "Use This"
+        self.range_end = tk.IntVar(value=1)  # Last frame copied by "Use This"
+        self.range_is_set = False  # Until a range is set, "Use This" copies only the current frame
+        self.target_dir = tk.StringVar(value=merged_dirs[0])  # Directory that receives picked frames
+        self.backup_var = tk.BooleanVar(value=True)
+        self.pane_images = [None] * len(merged_dirs)  # Keep PhotoImage references alive
+
+        all_files = [f for f in os.listdir(original_dir) if f.endswith('.png')]
+        self.max_image_number = max([int(os.path.splitext(f)[0]) for f in all_files], default=1)
+
+        self.pane_size = self.calculate_pane_size()
+        self.create_widgets()
+        self.load_frame()
+
+    def calculate_pane_size(self):
+        columns = min(len(self.merged_dirs), 3)
+        rows = math.ceil(len(self.merged_dirs) / columns)
+        pane_width = int(self.winfo_screenwidth() * 0.9 / columns)
+        pane_height = int(self.winfo_screenheight() * 0.7 / rows)
+        return pane_width, pane_height
+
+    def create_widgets(self):
+        controls = tk.Frame(self)
+        controls.pack(side=tk.TOP, fill=tk.X, padx=10, pady=5)
+
+        tk.Button(controls, text="Previous Image", command=self.previous_image).pack(side=tk.LEFT, padx=5)
+        current_entry = tk.Entry(controls, textvariable=self.current_image_number, width=6)
+        current_entry.pack(side=tk.LEFT, padx=5)
+        current_entry.bind("<Return>", lambda event: self.load_frame())
+        tk.Button(controls, text="Next Image", command=self.next_image).pack(side=tk.LEFT, padx=5)
+
+        self.image_num_label = tk.Label(controls, text="0/0")
+        self.image_num_label.pack(side=tk.LEFT, padx=10)
+
+        tk.Checkbutton(controls, text="Show Original", variable=self.show_original_var,
+                       command=self.render_panes).pack(side=tk.LEFT, padx=10)
+        # Picks up frames changed on disk since they were shown, e.g. saved from the main window
+        tk.Button(controls, text="Refresh", command=self.render_panes).pack(side=tk.LEFT, padx=5)
+
+        # Range used by the "Use This" buttons
+        tk.Button(controls, text="Set From", command=lambda: self.set_range(self.range_start)).pack(side=tk.LEFT, padx=5)
+        range_start_entry = tk.Entry(controls, textvariable=self.range_start, width=6)
+        range_start_entry.pack(side=tk.LEFT)
+        range_start_entry.bind("<Key>", lambda event: setattr(self, "range_is_set", True))
+        tk.Button(controls, text="Set To", command=lambda: self.set_range(self.range_end)).pack(side=tk.LEFT, padx=5)
+        range_end_entry = tk.Entry(controls, textvariable=self.range_end, width=6)
+        range_end_entry.pack(side=tk.LEFT)
+        range_end_entry.bind("<Key>", lambda event: setattr(self, "range_is_set", True))
+        tk.Button(controls, text="Clear Range", command=self.clear_range).pack(side=tk.LEFT, padx=5)
+
+        tk.Label(controls, text="Target:").pack(side=tk.LEFT, padx=5)
+        ttk.Combobox(controls, textvariable=self.target_dir, values=self.merged_dirs, state="readonly",
+                     width=30).pack(side=tk.LEFT)
+        tk.Checkbutton(controls, text="Make Backup", variable=self.backup_var).pack(side=tk.LEFT, padx=5)
+
+        panes = tk.Frame(self)
+        panes.pack(side=tk.TOP, expand=True, fill=tk.BOTH, padx=10, pady=5)
+
+        columns = min(len(self.merged_dirs), 3)
+        self.canvases = []
+        for i, merged_dir in enumerate(self.merged_dirs):
+            pane = tk.Frame(panes)
+            pane.grid(row=i // columns, column=i % columns, padx=5, pady=5)
+
+            header = tk.Frame(pane)
+            header.pack(side=tk.TOP, fill=tk.X)
+            tk.Label(header, text=os.path.basename(merged_dir)).pack(side=tk.LEFT)
+            tk.Button(header, text="Use This", command=lambda d=merged_dir: self.use_source(d)).pack(side=tk.RIGHT)
+
+            canvas = tk.Canvas(pane, bg='white', width=self.pane_size[0], height=self.pane_size[1])
+            canvas.pack()
+            canvas.bind("<Button-1>", lambda event: self.next_image())
+            self.canvases.append(canvas)
+
+        # Keyboard navigation, synchronized across all panes
+        self.bind("<Right>", lambda event: self.handle_key(event, self.next_image))
+        self.bind("<Left>", lambda event: self.handle_key(event, self.previous_image))
+        self.bind("<space>", lambda event: self.handle_key(event, self.toggle_show_original))
+
+    def handle_key(self, event, action):
+        # Leave the keys to text fields (ttk.Combobox is a ttk.Entry) while the user is typing in them
+        if isinstance(event.widget, (tk.Entry, ttk.Entry)):
+            return
+        action()
+
+    def frame_path(self, directory, image_number):
+        return os.path.join(directory, f"{str(image_number).zfill(5)}.png")
+
+    def load_frame(self):
+        image_number = min(max(self.current_image_number.get(), 1), self.max_image_number)
+        self.current_image_number.set(image_number)
+        self.image_num_label.config(text=f"{image_number}/{self.max_image_number}")
+        if not self.range_is_set:  # Follow the current frame until the user picks a range
+            self.range_start.set(image_number)
+            self.range_end.set(image_number)
+        self.render_panes()
+
+    def set_range(self, variable):
+        variable.set(self.current_image_number.get())
+        self.range_is_set = True
+
+    def clear_range(self):
+        self.range_is_set = False
+        self.range_start.set(self.current_image_number.get())
+        self.range_end.set(self.current_image_number.get())
+
+    def render_panes(self):
+        image_number = self.current_image_number.get()
+        for i, merged_dir in enumerate(self.merged_dirs):
+            source_dir = self.original_dir if self.show_original_var.get() else merged_dir
+            image = self.cache.get(self.frame_path(source_dir, image_number), self.pane_size)
+
+            canvas = self.canvases[i]
+            canvas.delete(tk.ALL)
+            if image is None:
+                self.pane_images[i] = None
+                canvas.create_text(self.pane_size[0] // 2, self.pane_size[1] // 2, text="Image not found")
+                continue
+            self.pane_images[i] = ImageTk.PhotoImage(image)
+            canvas.create_image(0, 0, anchor=tk.NW, image=self.pane_images[i])
+
+    def toggle_show_original(self):
+        self.show_original_var.set(not self.show_original_var.get())
+        self.render_panes()
+
+    def next_image(self):
+        self.current_image_number.set(self.current_image_number.get() + 1)
+        self.load_frame()
+
+    def previous_image(self):
+        if self.current_image_number.get() > 1:
+            self.current_image_number.set(self.current_image_number.get() - 1)
+            self.load_frame()
+
+    def use_source(self, source_dir):
+        target_dir = self.target_dir.get()
+        if os.path.normpath(source_dir) == os.path.normpath(target_dir):
+            messagebox.showinfo("Use This", "Source and target directories are the same.", parent=self)
+            return
+
+        try:
+            start, end = self.range_start.get(), self.range_end.get()
+        except tk.TclError:
+            messagebox.showerror("Error", "From and To must be frame numbers.", parent=self)
+            return
+        if start > end:
+            messagebox.showerror("Error", f"From ({start}) is after To ({end}).", parent=self)
+            return
+
+        frame_count = end - start + 1
+        if frame_count > 1 and not messagebox.askyesno(
+                "Use This", f"Copy {frame_count} frames ({start}-{end}) from {source_dir} to {target_dir}?",
+                parent=self):
+            return
+
+        copied = 0
+        for image_number in range(start, end + 1):
+            source_path = self.frame_path(source_dir, image_number)
+            if not os.path.isfile(source_path):
+                continue
+            target_path = self.frame_path(target_dir, image_number)
+            if self.backup_var.get():
+                backup_frame_file(target_path)
+            copy_frame_file(source_path, target_path, False)
+            self.cache.invalidate(target_path)
+            copied += 1
+
+        print(f"Copied {copied} image(s) from {source_dir} to {target_dir}")
+        self.render_panes()
+
 
 class ImageProcessorApp(tk.Tk):
     def __init__(self):
@@ -33,6 +436,8 @@ class ImageProcessorApp(tk.Tk):
         self.average_path_var = tk.BooleanVar(value=False)  # Variable for the Average Path checkbox
         self.window_size_var = tk.IntVar(value=5)  # Default window size for averaging
         self.use_original_backup_var = tk.BooleanVar(value=True)  # Backup option for "Use Original" operation
+        self.pending_patches = []  # Patches copied onto the current image but not yet saved
+        self.reapply_dir = None  # Directory being patched by Reapply Patches, None when no run is active
 
         # Continuous advancement variables
         self.is_advancing = False  # Flag to indicate continuous advancement
@@ -67,6 +472,10 @@ class ImageProcessorApp(tk.Tk):
         canvas_zoom_entry.pack(pady=5)
         canvas_zoom_entry.bind("<Return>", lambda event: self.adjust_canvas_zoom())
 
+        self.reapply_button = tk.Button(left_frame, text="Reapply Patches", command=self.reapply_patches_to_directory)
+        self.reapply_button.pack(pady=5)
+        tk.Button(left_frame, text="Compare Merges", command=self.open_compare_window).pack(pady=5)
+
         # Center Frame for canvas and navigation controls
         center_frame = tk.Frame(self)
         center_frame.pack(side=tk.LEFT, expand=True, fill=tk.BOTH)
@@ -159,6 +568,10 @@ class ImageProcessorApp(tk.Tk):
         self.use_original_backup_checkbox = tk.Checkbutton(self.right_frame, text="Backup on Use Original",
                                                            variable=self.use_original_backup_var)
 
+        # Removes the current frame's saved patches so a re-merge no longer replays them
+        self.clear_patches_button = tk.Button(self.right_frame, text="Clear Saved Patches",
+                                              command=self.clear_saved_patches)
+
         # Keep Tools Visible checkbox
         self.keep_tools_visible_var = tk.BooleanVar(value=False)
         self.keep_tools_visible_checkbox = tk.Checkbutton(self.right_frame, text="Keep Tools Visible",
@@ -192,6 +605,7 @@ class ImageProcessorApp(tk.Tk):
             self.save_button.pack(pady=5)
             self.use_original_button.pack(pady=5)
             self.use_original_backup_checkbox.pack(pady=5)
+            self.clear_patches_button.pack(pady=5)
 
         else:
             self.image_selector_label.pack_forget()
@@ -212,6 +626,7 @@ class ImageProcessorApp(tk.Tk):
             self.save_button.pack_forget()
             self.use_original_button.pack_forget()
             self.use_original_backup_checkbox.pack_forget()
+            self.clear_patches_button.pack_forget()
 
         # No changes to event bindings here, ensure image advancement works independently
 
@@ -244,6 +659,8 @@ class ImageProcessorApp(tk.Tk):
         self.load_image()
 
     def select_directory(self):
+        if self.is_reapplying("Select Image Directory"):
+            return
         directory = filedialog.askdirectory()
         if directory:
             self.curr_dir.set(directory)
@@ -264,11 +681,15 @@ class ImageProcessorApp(tk.Tk):
             self.update_image_num_label()  # Update the label and progress bar
 
     def load_image(self):
+        if self.is_reapplying_current_directory():
+            return
         image_number = self.current_image_number.get()
         merged_image_path = os.path.join(self.curr_dir.get(), f"{str(image_number).zfill(5)}.png")
         original_image_path = os.path.join(os.path.dirname(self.curr_dir.get()), f"{str(image_number).zfill(5)}.png")
 
-        # Always load the images
+        # Always load the images, dropping edits and undo state that belonged to the previous one
+        self.pending_patches = []
+        self.previous_image_state = None
         if os.path.isfile(merged_image_path):
             self.modified_image = Image.open(merged_image_path)
         else:
@@ -304,6 +725,8 @@ class ImageProcessorApp(tk.Tk):
         self.progress_bar['value'] = progress
 
     def process_image(self):
+        if self.is_reapplying_current_directory():
+            return
         # Load both merged and original images into memory
         image_number = self.current_image_number.get()
         merged_image_path = os.path.join(self.curr_dir.get(), f"{str(image_number).zfill(5)}.png")
@@ -312,6 +735,8 @@ class ImageProcessorApp(tk.Tk):
         if os.path.isfile(merged_image_path) and os.path.isfile(original_image_path):
             self.modified_image = Image.open(merged_image_path)
             self.data_dst_image = Image.open(original_image_path)
+            self.pending_patches = []
+            self.previous_image_state = None
             self.display_image(self.modified_image)  # Default to showing the merged image
 
             # Show the additional controls
@@ -551,40 +976,27 @@ class ImageProcessorApp(tk.Tk):
 
     def copy_traced_area_unzoomed(self):
         if self.data_dst_image and self.traced_path:
-            self.previous_image_state = self.modified_image.copy()  # Save current state for undo
-            mask = Image.new("L", self.modified_image.size, 0)
-            draw = ImageDraw.Draw(mask)
-
             # Use the original traced path (blue line) for copying
             scaled_traced_path = [(int(x / self.scale_factor), int(y / self.scale_factor)) for x, y in self.traced_path]
-            draw.polygon(scaled_traced_path, outline=1, fill=255)
-
-            selected_area = Image.new("RGB", self.modified_image.size)
-            selected_area.paste(self.data_dst_image, mask=mask)
-            self.modified_image.paste(selected_area, mask=mask)
-
-            # After copying, display the modified image and update dropdown to reflect the change
-            self.display_image(self.modified_image)
-            self.image_selector.set("Merged Image")
-            self.clear_traced_path()  # Clear the path after copying
+            self.copy_polygon(scaled_traced_path)
 
     def copy_traced_area_zoomed(self):
         if self.data_dst_image and self.traced_path:
-            self.previous_image_state = self.modified_image.copy()  # Save current state for undo
-            mask = Image.new("L", self.modified_image.size, 0)
-            draw = ImageDraw.Draw(mask)
-
             # Use the original traced path (blue line) for copying
-            draw.polygon(self.traced_path, outline=1, fill=255)
+            self.copy_polygon(self.traced_path)
 
-            selected_area = Image.new("RGB", self.modified_image.size)
-            selected_area.paste(self.data_dst_image, mask=mask)
-            self.modified_image.paste(selected_area, mask=mask)
+    def copy_polygon(self, polygon):
+        feather = self.feather_radius.get() if self.smoothing_var.get() else 0
+        patch = make_patch(polygon, self.modified_image.size, feather)
+        if patch:
+            self.previous_image_state = self.modified_image.copy()  # Save current state for undo
+            apply_patch(self.modified_image, self.data_dst_image, patch)
+            self.pending_patches.append(patch)  # Recorded in the patch store on save
 
-            # After copying, display the modified image and update dropdown to reflect the change
-            self.display_image(self.modified_image)
-            self.image_selector.set("Merged Image")
-            self.clear_traced_path()  # Clear the path after copying
+        # After copying, display the modified image and update dropdown to reflect the change
+        self.display_image(self.modified_image)
+        self.image_selector.set("Merged Image")
+        self.clear_traced_path()  # Clear the path after copying
 
     def apply_smoothing(self, image, mask):
         # Feather the mask by applying a slight blur to it
@@ -614,8 +1026,12 @@ class ImageProcessorApp(tk.Tk):
             self.modified_image = self.previous_image_state
             self.display_image(self.modified_image)
             self.previous_image_state = None  # Clear undo history after undoing
+            if self.pending_patches:
+                self.pending_patches.pop()  # The undone copy should not be recorded either
 
     def save_image(self):
+        if self.is_reapplying("Save"):
+            return
         if self.modified_image:
             save_path = os.path.join(self.curr_dir.get(), f"{str(self.current_image_number.get()).zfill(5)}.png")
             if self.backup_var.get():  # If backup is checked
@@ -624,12 +1040,125 @@ class ImageProcessorApp(tk.Tk):
                     os.rename(save_path, backup_path)  # Rename the old file to create a backup
             self.modified_image.save(save_path)
             print(f"Image saved to {save_path}")  # Print save message to console
+            if self.pending_patches:
+                self.get_patch_store().add(self.current_image_number.get(), self.pending_patches)
+                print(f"Recorded {len(self.pending_patches)} patch(es) for image {self.current_image_number.get()}")
             self.load_image()  # Reload the saved image to show it
             self.toggle_right_frame_controls(False)  # Hide controls after saving
 
     def flatten_coords(self, coords):
         return [coord for xy in coords for coord in xy]
 
+    def get_patch_store(self):
+        return patch_store_for(self.curr_dir.get())
+
+    def clear_saved_patches(self):
+        if self.is_reapplying("Clear Saved Patches"):
+            return
+        image_number = self.current_image_number.get()
+        store = self.get_patch_store()
+        count = len(store.load(image_number))
+        if not count:
+            messagebox.showinfo("Clear Saved Patches", f"Image {image_number} has no saved patches.")
+            return
+        if not messagebox.askyesno("Clear Saved Patches",
+                                   f"Remove {count} saved patch(es) for image {image_number}? "
+                                   f"They will no longer be reapplied after a re-merge."):
+            return
+
+        store.remove(image_number)
+        print(f"Removed {count} saved patch(es) for image {image_number}")
+
+    def reapply_patches_to_directory(self):
+        directory = filedialog.askdirectory(title="Select Merged Directory to Patch")
+        if not directory:
+            return
+        store = patch_store_for(directory)
+        frame_numbers = store.frame_numbers()
+        if not frame_numbers:
+            messagebox.showerror("Error", f"No saved patches found for {directory}.")
+            return
+
+        message = (f"Reapply saved patches to {len(frame_numbers)} image(s) in {directory}?\n\n"
+                   "The images are overwritten without a backup.")
+        is_current_dir = self.is_current_directory(directory)
+        if is_current_dir:
+            message += ("\n\nThis is the directory you are editing, so the patches are probably already "
+                        "applied here. Feathered patches will be blended a second time.")
+        if not messagebox.askyesno("Reapply Patches", message,
+                                   icon=messagebox.WARNING if is_current_dir else messagebox.QUESTION):
+            return
+
+        # Replay in worker threads and poll for progress so the UI stays responsive
+        executor = ThreadPoolExecutor()
+        futures = submit_patch_replay(executor, directory, store)
+        executor.shutdown(wait=False)
+        self.reapply_dir = directory
+        self.reapply_button.config(state=tk.DISABLED)
+        self.poll_reapply_patches(directory, futures)
+
+    def poll_reapply_patches(self, directory, futures):
+        done = sum(future.done() for image_number, future in futures)
+        self.image_num_label.config(text=f"Patching {done}/{len(futures)}")
+        self.progress_bar['value'] = (done / len(futures)) * 100
+        if done < len(futures):
+            self.after(100, lambda: self.poll_reapply_patches(directory, futures))
+            return
+
+        self.reapply_dir = None
+        self.reapply_button.config(state=tk.NORMAL)
+        count, errors = collect_patch_replay(futures)
+        if errors:
+            messagebox.showerror("Reapply Patches", f"Reapplied patches to {count} image(s), "
+                                                    f"{len(errors)} failed. See the console for details.")
+        else:
+            messagebox.showinfo("Reapply Patches", f"Reapplied patches to {count} image(s).")
+
+        # Reload the current image if it was just patched, otherwise restore the label and progress bar
+        if self.is_current_directory(directory) and (not self.pending_patches or messagebox.askyesno(
+                "Reapply Patches", "Reload the current image to show the patched version? "
+                                   "Your unsaved changes to it will be lost.")):
+            self.load_image()
+        elif hasattr(self, "max_image_number"):
+            self.update_image_num_label()
+        else:
+            self.image_num_label.config(text="0/0")
+            self.progress_bar['value'] = 0
+
+    def is_reapplying(self, action):
+        # Saving or resetting frames during a run could race its workers on the same files or patch store
+        if self.reapply_dir is None:
+            return False
+        messagebox.showinfo(action, "Wait for Reapply Patches to finish.")
+        return True
+
+    def is_reapplying_current_directory(self):
+        # Frames in the directory being patched are not loaded until the run is done
+        return self.reapply_dir is not None and self.is_current_directory(self.reapply_dir)
+
+    def is_current_directory(self, directory):
+        return bool(self.curr_dir.get()) and (os.path.normpath(os.path.abspath(directory)) ==
+                                              os.path.normpath(os.path.abspath(self.curr_dir.get())))
+
+    def open_compare_window(self):
+        original_dir = filedialog.askdirectory(title="Select data_dst Directory")
+        if not original_dir:
+            return
+
+        # Keep asking for merged directories until the dialog is cancelled
+        merged_dirs = []
+        while True:
+            directory = filedialog.askdirectory(title=f"Select Merged Directory {len(merged_dirs) + 1} "
+                                                      f"(Cancel when done)", initialdir=original_dir)
+            if not directory:
+                break
+            merged_dirs.append(directory)
+
+        if not merged_dirs:
+            messagebox.showerror("Error", "No merged directories selected.")
+            return
+        CompareWindow(self, original_dir, merged_dirs)
+
     def start_next_image_loop(self, event):
         self.is_advancing = True
         self.advance_images("next")
@@ -650,10 +1179,14 @@ class ImageProcessorApp(tk.Tk):
             self.after(self.advance_delay.get(), lambda: self.advance_images(direction))
 
     def next_image(self):
+        if self.is_reapplying_current_directory():
+            return
         self.current_image_number.set(self.current_image_number.get() + 1)
         self.load_image()
 
     def previous_image(self):
+        if self.is_reapplying_current_directory():
+            return
         if self.current_image_number.get() > 1:
             self.current_image_number.set(self.current_image_number.get() - 1)
             self.load_image()
@@ -666,18 +1199,15 @@ class ImageProcessorApp(tk.Tk):
             self.advance_delay.set(1000)
 
     def use_original_image(self):
+        if self.is_reapplying("Use Original"):
+            return
         image_number = self.current_image_number.get()
         merged_image_path = os.path.join(self.curr_dir.get(), f"{str(image_number).zfill(5)}.png")
         original_image_path = os.path.join(os.path.dirname(self.curr_dir.get()), f"{str(image_number).zfill(5)}.png")
 
         if os.path.isfile(original_image_path):
-            # Optionally make a backup
-            if self.use_original_backup_var.get() and os.path.isfile(merged_image_path):
-                backup_path = merged_image_path + ".bak"
-                os.rename(merged_image_path, backup_path)
-
-            # Copy the original image to the merged directory
-            self.data_dst_image.save(merged_image_path)
+            # Copy the original image to the merged directory, optionally making a backup
+            copy_frame_file(original_image_path, merged_image_path, self.use_original_backup_var.get())
             print(f"Copied original image to {merged_image_path}")
 
             # Advance to the next image
@@ -692,5 +1222,29 @@ class ImageProcessorApp(tk.Tk):
 
 
 if __name__ == "__main__":
-    app = ImageProcessorApp()
-    app.mainloop()
+    parser = argparse.ArgumentParser(description="DeepFaceLab: Process Merge")
+    parser.add_argument("--reapply-patches", metavar="MERGED_DIR",
+                        help="Replay the saved patches over MERGED_DIR and exit")
+    parser.add_argument("--workers", type=int, default=None, help="Number of parallel workers for --reapply-patches")
+    parser.add_argument("--remove-patches", nargs=2, metavar=("MERGED_DIR", "FRAME"),
+                        help="Remove the saved patches of frame FRAME for MERGED_DIR and exit")
+    args = parser.parse_args()
+
+    if args.remove_patches:
+        merged_dir, frame = args.remove_patches
+        store = patch_store_for(merged_dir)
+        count = store.remove(int(frame))
+        if not count:
+            sys.exit(f"Error: frame {frame} has no saved patches in {store.directory}.")
+        print(f"Removed {count} saved patch(es) for frame {frame}.")
+    elif args.reapply_patches:
+        store = patch_store_for(args.reapply_patches)
+        if not store.frame_numbers():
+            sys.exit(f"Error: no saved patches found in {store.directory}.")
+        count, errors = reapply_patches(args.reapply_patches, args.workers)
+        print(f"Reapplied patches to {count} image(s).")
+        if errors:
+            sys.exit(f"Error: failed to reapply patches to {len(errors)} image(s).")
+    else:
+        app = ImageProcessorApp()
+        app.mainloop()